@@ -302,28 +302,50 @@ template <typename Real> void declare_functional(py::module &m) {
 
   py::class_<Predictor>(m, "Predictor")
       .def_readonly("samples", &Predictor::samples)
-      .def("predict", &Predictor::predict)
-      .def("predict_parallel", &Predictor::predict_parallel)
-      .def("predict_parallel_oprobit", &Predictor::predict_parallel_oprobit)
+      .def("predict", &Predictor::predict,
+           py::call_guard<py::gil_scoped_release>())
+      .def("predict_parallel", &Predictor::predict_parallel,
+           py::call_guard<py::gil_scoped_release>())
+      .def("predict_parallel_oprobit", &Predictor::predict_parallel_oprobit,
+           py::call_guard<py::gil_scoped_release>())
+      .def("stack_parameters", &Predictor::stack_parameters,
+           py::arg("single_precision") = false,
+           "Keep a copy of the parameters in a layout faster to predict with.")
+      .def("clear_parameter_stack", &Predictor::clear_parameter_stack)
+      .def_property_readonly("parameters_stacked",
+                             &Predictor::parameters_stacked)
+      .def_property_readonly(
+          "single_precision", &Predictor::single_precision,
+          "Whether the stacked parameters are kept in single precision.")
       .def(py::pickle(
           [](const Predictor &predictor) {
+            /* 0: not stacked, 1: stacked, 2: stacked in single precision */
+            int stack_mode = predictor.parameters_stacked()
+                                 ? (predictor.single_precision() ? 2 : 1)
+                                 : 0;
             return py::make_tuple(predictor.rank, predictor.feature_size,
                                   static_cast<int>(predictor.type),
-                                  predictor.samples);
+                                  predictor.samples, stack_mode);
           },
           [](py::tuple t) {
-            if (t.size() != 4) {
+            if (t.size() != 4 && t.size() != 5) {
               throw std::runtime_error("invalid state for FMHyperParameters.");
             }
             Predictor *p =
                 new Predictor(t[0].cast<size_t>(), t[1].cast<size_t>(),
                               static_cast<TASKTYPE>(t[2].cast<int>()));
             p->set_samples(std::move(t[3].cast<vector<FM>>()));
+            /* Earlier versions do not store the stack mode. */
+            int stack_mode = (t.size() == 5) ? t[4].cast<int>() : 0;
+            if (stack_mode != 0) {
+              p->stack_parameters(stack_mode == 2);
+            }
             return p;
           }));
 
   py::class_<VPredictor>(m, "VariationalPredictor")
-      .def("predict", &VPredictor::predict)
+      .def("predict", &VPredictor::predict,
+           py::call_guard<py::gil_scoped_release>())
       .def(py::pickle(
           [](const VPredictor &predictor) {
             return py::make_tuple(predictor.rank, predictor.feature_size,
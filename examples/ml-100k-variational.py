@@ -1,7 +1,6 @@
 import argparse
 from typing import List
 
-import numpy as np
 import pandas as pd
 
 from myfm import RelationBlock, VariationalFMRegressor
@@ -157,7 +156,7 @@ if __name__ == "__main__":
     train_blocks: List[RelationBlock] = []
     test_blocks: List[RelationBlock] = []
     for source, target in [(df_train, train_blocks), (df_test, test_blocks)]:
-        unique_users, user_map = np.unique(source.user_id, return_inverse=True)
+        user_map, unique_users = pd.factorize(source.user_id.values)
         target.append(
             RelationBlock(
                 user_map,
@@ -169,7 +168,7 @@ if __name__ == "__main__":
                 ),
             )
         )
-        unique_movies, movie_map = np.unique(source.movie_id, return_inverse=True)
+        movie_map, unique_movies = pd.factorize(source.movie_id.values)
         target.append(
             RelationBlock(
                 movie_map,
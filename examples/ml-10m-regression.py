@@ -137,14 +137,12 @@ if __name__ == "__main__":
     def categorize_date(df):
         return date_encoder.to_sparse(df.timestamp.dt.date.values)
 
-    movie_vs_watched: Dict[int, List[int]] = dict()
-    user_vs_watched: Dict[int, List[int]] = dict()
-
-    for row in implicit_data_source.itertuples():
-        user_id = row.user_id
-        movie_id = row.movie_id
-        movie_vs_watched.setdefault(movie_id, list()).append(user_id)
-        user_vs_watched.setdefault(user_id, list()).append(movie_id)
+    movie_vs_watched: Dict[int, List[int]] = (
+        implicit_data_source.groupby("movie_id").user_id.apply(list).to_dict()
+    )
+    user_vs_watched: Dict[int, List[int]] = (
+        implicit_data_source.groupby("user_id").movie_id.apply(list).to_dict()
+    )
 
     if use_date:
         X_date_train = categorize_date(df_train)
@@ -229,9 +227,9 @@ if __name__ == "__main__":
     train_blocks: List[RelationBlock] = []
     test_blocks: List[RelationBlock] = []
     for source, target in [(df_train, train_blocks), (df_test, test_blocks)]:
-        unique_users, user_map = np.unique(source.user_id, return_inverse=True)
+        user_map, unique_users = pd.factorize(source.user_id.values)
         target.append(RelationBlock(user_map, augment_user_id(unique_users)))
-        unique_movies, movie_map = np.unique(source.movie_id, return_inverse=True)
+        movie_map, unique_movies = pd.factorize(source.movie_id.values)
         target.append(RelationBlock(movie_map, augment_movie_id(unique_movies)))
 
     trace_path = "rmse_{0}_fold_{1}.csv".format(ALGORITHM, FOLD_INDEX)
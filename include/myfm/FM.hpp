@@ -12,6 +12,7 @@ template <typename Real> struct FM {
   typedef relational::RelationBlock<Real> RelationBlock;
 
   typedef types::DenseMatrix<Real> DenseMatrix;
+  typedef types::RowMajorDenseMatrix<Real> RowMajorDenseMatrix;
   typedef types::SparseMatrix<Real> SparseMatrix;
   typedef types::Vector<Real> Vector;
 
@@ -51,9 +52,10 @@ template <typename Real> struct FM {
     return result;
   }
 
-  inline void
-  predict_score_write_target(Eigen::Ref<Vector> target, const SparseMatrix &X,
-                             const vector<RelationBlock> &relations) const {
+  inline void predict_score_write_target(Eigen::Ref<Vector> target,
+                                         const SparseMatrix &X,
+                                         const vector<RelationBlock> &relations,
+                                         bool use_openmp = true) const {
     // check input consistency
     size_t case_size = X.rows();
     size_t feature_size_all = X.cols();
@@ -75,65 +77,110 @@ template <typename Real> struct FM {
     if (!initialized) {
       throw std::runtime_error("get_score called before initialization");
     }
-    target = w0 + (X * w.head(X.cols())).array();
+    Vector w0s = Vector::Constant(1, w0);
+    Vector sqt = V.rowwise().squaredNorm();
+    size_t nnz = X.nonZeros();
+    for (auto const &rel : relations) {
+      nnz += rel.X.nonZeros();
+    }
+    if (nnz >= static_cast<size_t>(V.rows())) {
+      // Reading the column-major V row by row is strided. Once the data
+      // has as many non-zeros as there are features, a row-major copy costs
+      // less than that.
+      RowMajorDenseMatrix V_row_major = V;
+      predict_score_stacked(target, w0s, w, V_row_major, sqt, X, relations,
+                            use_openmp);
+    } else {
+      predict_score_stacked(target, w0s, w, V, sqt, X, relations, use_openmp);
+    }
+  }
+
+  /*
+  Compute the scores of several FMs with a single traversal of each data block.
+  The parameters of the k-th FM are given by
+    w0 = w0s(k),
+    w = W.col(k),
+    V = V.middleCols(k * rank, rank),
+  and sqt.col(k) must hold the row-wise sum of V^2.
+  W, V and sqt are read in place and may have a different scalar type;
+  for several FMs they should be row-major.
+  The score of the k-th FM is written to target.col(k).
+
+  X w, X V and X^2 sqt are accumulated row by row and reduced immediately,
+  so that neither X^2 nor any (X.rows(), *) intermediate is allocated.
+  For relation blocks, the products are computed once per block row and
+  looked up for each case.
+
+  When compiled with OpenMP, the rows are distributed among Eigen::nbThreads()
+  threads. Callers which already run on their own worker threads should pass
+  use_openmp = false, so that the threads do not multiply.
+  */
+  template <typename WType, typename VType, typename SqtType>
+  static inline void predict_score_stacked(
+      Eigen::Ref<DenseMatrix> target, const Eigen::Ref<const Vector> &w0s,
+      const Eigen::MatrixBase<WType> &W, const Eigen::MatrixBase<VType> &V,
+      const Eigen::MatrixBase<SqtType> &sqt, const SparseMatrix &X,
+      const vector<RelationBlock> &relations, bool use_openmp = true) {
+    using RowVector = Eigen::Matrix<Real, 1, -1>;
+    const Eigen::Index n_fms = w0s.rows();
+    const Eigen::Index rank = V.cols() / n_fms;
+
+    vector<RowMajorDenseMatrix> block_XWs;
+    vector<RowMajorDenseMatrix> block_XVs;
+    vector<RowMajorDenseMatrix> block_qs;
+    block_XWs.reserve(relations.size());
+    block_XVs.reserve(relations.size());
+    block_qs.reserve(relations.size());
     size_t offset = X.cols();
     for (auto iter = relations.begin(); iter != relations.end(); iter++) {
-      Vector w0_cache = (iter->X) * w.segment(offset, iter->feature_size);
-      size_t j = 0;
-      for (auto i : (iter->original_to_block)) {
-        target(j++) += w0_cache(i);
-      }
+      block_XWs.emplace_back(
+          iter->X *
+          W.middleRows(offset, iter->feature_size).template cast<Real>());
+      block_XVs.emplace_back(
+          iter->X *
+          V.middleRows(offset, iter->feature_size).template cast<Real>());
+      block_qs.emplace_back(
+          iter->X.cwiseAbs2() *
+          sqt.middleRows(offset, iter->feature_size).template cast<Real>());
       offset += iter->feature_size;
     }
 
-    Vector q_cache(target.rows());
-    size_t buffer_size = 1;
-    vector<Real> buffer_cache(1);
-    vector<Vector> block_q_caches;
-    for (auto &relation : relations) {
-      buffer_size = std::max(buffer_size, relation.block_size);
-    }
-    buffer_cache.resize(buffer_size);
-
-    for (int factor_index = 0; factor_index < this->n_factors; factor_index++) {
-      q_cache = X * V.col(factor_index).head(X.cols());
-      size_t offset = X.cols();
-      size_t relation_index = 0;
-      for (auto iter = relations.begin(); iter != relations.end();
-           iter++, relation_index++) {
-        Eigen::Map<Vector> block_cache(buffer_cache.data(), iter->block_size);
-        block_cache =
-            iter->X * V.col(factor_index).segment(offset, iter->feature_size);
-        offset += iter->feature_size;
-        size_t train_case_index = 0;
-        for (auto i : iter->original_to_block) {
-          q_cache(train_case_index++) += block_cache(i);
+#ifdef EIGEN_HAS_OPENMP
+#pragma omp parallel if (use_openmp && Eigen::nbThreads() > 1)
+#endif
+    {
+      RowVector acc_w(n_fms);
+      RowVector acc_v(V.cols());
+      RowVector q(n_fms);
+#ifdef EIGEN_HAS_OPENMP
+#pragma omp for schedule(static)
+#endif
+      for (Eigen::Index row = 0; row < X.rows(); row++) {
+        acc_w.setZero();
+        acc_v.setZero();
+        q.setZero();
+        for (typename SparseMatrix::InnerIterator it(X, row); it; ++it) {
+          const Real value = it.value();
+          acc_w += value * W.row(it.index()).template cast<Real>();
+          acc_v += value * V.row(it.index()).template cast<Real>();
+          q += (value * value) * sqt.row(it.index()).template cast<Real>();
         }
-      }
-      target.array() += q_cache.array().square() * static_cast<Real>(0.5);
-
-      offset = X.cols();
-      relation_index = 0;
-      q_cache = X.cwiseAbs2() *
-                (V.col(factor_index).head(X.cols()).array().square().matrix());
-      for (auto iter = relations.begin(); iter != relations.end();
-           iter++, relation_index++) {
-        Eigen::Map<Vector> block_cache(buffer_cache.data(), iter->block_size);
-        block_cache =
-            (iter->X.cwiseAbs2()) * (V.col(factor_index)
-                                         .segment(offset, iter->feature_size)
-                                         .array()
-                                         .square()
-                                         .matrix());
-        offset += iter->feature_size;
-        size_t train_case_index = 0;
-        for (auto i : iter->original_to_block) {
-          q_cache(train_case_index++) += block_cache(i);
+        for (size_t r = 0; r < relations.size(); r++) {
+          size_t block_row = relations[r].original_to_block[row];
+          acc_w += block_XWs[r].row(block_row);
+          acc_v += block_XVs[r].row(block_row);
+          q += block_qs[r].row(block_row);
+        }
+        for (Eigen::Index k = 0; k < n_fms; k++) {
+          target(row, k) =
+              w0s(k) + acc_w(k) +
+              (acc_v.segment(k * rank, rank).squaredNorm() - q(k)) *
+                  static_cast<Real>(0.5);
         }
       }
-      target -= q_cache * static_cast<Real>(0.5);
     }
   }
+
   inline DenseMatrix
   oprobit_predict_proba(const SparseMatrix &X,
                         const vector<RelationBlock> &relations,
@@ -142,23 +189,33 @@ template <typename Real> struct FM {
       throw std::runtime_error("No cutpoint available for this FM.");
     }
     int n_cpt = cutpoints.at(cutpoint_index).size();
-    DenseMatrix result = DenseMatrix::Zero(X.rows(), n_cpt + 1);
-
     Vector score(X.rows());
     DenseMatrix cache(X.rows(), n_cpt + 1);
-    predict_score_write_target(score, X, relations);
+    oprobit_predict_proba_write_target(cache, score, X, relations,
+                                       cutpoint_index);
+    return cache;
+  }
+
+  inline void oprobit_predict_proba_write_target(
+      Eigen::Ref<DenseMatrix> target, Eigen::Ref<Vector> score,
+      const SparseMatrix &X, const vector<RelationBlock> &relations,
+      size_t cutpoint_index, bool use_openmp = true) const {
+    if (cutpoints.empty()) {
+      throw std::runtime_error("No cutpoint available for this FM.");
+    }
+    int n_cpt = cutpoints.at(cutpoint_index).size();
+    predict_score_write_target(score, X, relations, use_openmp);
     for (int cpt_index = 0; cpt_index < n_cpt; cpt_index++) {
-      cache.col(cpt_index) =
+      target.col(cpt_index) =
           (1 + ((cutpoints.at(cutpoint_index)(cpt_index) - score.array()) *
                 static_cast<Real>(std::sqrt(0.5)))
                    .erf()) /
           2;
     }
-    cache.col(n_cpt) = (1 - cache.col(n_cpt - 1).array());
+    target.col(n_cpt) = (1 - target.col(n_cpt - 1).array());
     for (int col = n_cpt - 1; col >= 1; col--) {
-      cache.col(col) -= cache.col(col - 1);
+      target.col(col) -= target.col(col - 1);
     }
-    return cache;
   }
 
   const int n_factors;
@@ -16,6 +16,9 @@ namespace types {
 template <typename Real>
 using DenseMatrix = Eigen::Matrix<Real, -1, -1, Eigen::ColMajor>;
 
+template <typename Real>
+using RowMajorDenseMatrix = Eigen::Matrix<Real, -1, -1, Eigen::RowMajor>;
+
 template <typename Real> using Vector = Eigen::Matrix<Real, -1, 1>;
 
 template <typename Real>
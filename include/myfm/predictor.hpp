@@ -1,6 +1,7 @@
 #pragma once
 
 #include <atomic>
+#include <memory>
 #include <mutex>
 #include <thread>
 
@@ -16,6 +17,7 @@ template <typename Real, class FMType = FM<Real>> struct Predictor {
   typedef typename FMType::SparseMatrix SparseMatrix;
   typedef typename FMType::Vector Vector;
   typedef typename FMType::DenseMatrix DenseMatrix;
+  typedef typename FMType::RowMajorDenseMatrix RowMajorDenseMatrix;
   typedef typename FMType::RelationBlock RelationBlock;
 
   inline Predictor(size_t rank, size_t feature_size, TASKTYPE type)
@@ -41,32 +43,38 @@ template <typename Real, class FMType = FM<Real>> struct Predictor {
     }
     Vector result = Vector::Zero(X.rows());
     const size_t n_samples = this->samples.size();
+    const size_t batch_size = this->batch_size(X.rows(), n_workers);
 
     std::mutex mtx;
     std::atomic<size_t> currently_done(0);
     std::vector<std::thread> workers;
 
     for (size_t i = 0; i < n_workers; i++) {
-      workers.emplace_back(
-          [this, n_samples, &result, &X, &relations, &currently_done, &mtx] {
-            Vector cache(X.rows());
-            while (true) {
-              size_t cd = currently_done++;
-              if (cd >= n_samples)
-                break;
-              this->samples[cd].predict_score_write_target(cache, X, relations);
-              if (this->type == TASKTYPE::CLASSIFICATION) {
-                cache.array() =
-                    ((cache.array() * static_cast<Real>(std::sqrt(0.5))).erf() +
-                     static_cast<Real>(1)) /
-                    static_cast<Real>(2);
-              }
-              {
-                std::lock_guard<std::mutex> lock{mtx};
-                result += cache;
-              }
-            }
-          });
+      workers.emplace_back([this, n_samples, batch_size, &result, &X,
+                            &relations, &currently_done, &mtx] {
+        DenseMatrix cache(X.rows(), batch_size);
+        Vector partial_sum = Vector::Zero(X.rows());
+        while (true) {
+          size_t begin = currently_done.fetch_add(batch_size);
+          if (begin >= n_samples)
+            break;
+          size_t end = std::min(begin + batch_size, n_samples);
+          auto scores = cache.leftCols(end - begin);
+          this->predict_score_batch_write_target(scores, begin, end, X,
+                                                 relations, false);
+          if (this->type == TASKTYPE::CLASSIFICATION) {
+            scores.array() =
+                ((scores.array() * static_cast<Real>(std::sqrt(0.5))).erf() +
+                 static_cast<Real>(1)) /
+                static_cast<Real>(2);
+          }
+          partial_sum += scores.rowwise().sum();
+        }
+        {
+          std::lock_guard<std::mutex> lock{mtx};
+          result += partial_sum;
+        }
+      });
     }
     for (auto &worker : workers) {
       worker.join();
@@ -99,20 +107,21 @@ template <typename Real, class FMType = FM<Real>> struct Predictor {
       workers.emplace_back([this, n_samples, &result, &X, &relations,
                             &currently_done, &mtx, cutpoint_index, n_cpt] {
         Vector score(X.rows());
+        DenseMatrix sample_result(X.rows(), n_cpt + 1);
+        DenseMatrix partial_sum = DenseMatrix::Zero(X.rows(), n_cpt + 1);
 
         while (true) {
           size_t cd = currently_done.fetch_add(1);
           if (cd >= n_samples)
             break;
 
-          DenseMatrix sample_result =
-              this->samples.at(cd).oprobit_predict_proba(X, relations,
-                                                         cutpoint_index);
-
-          {
-            std::lock_guard<std::mutex> lock{mtx};
-            result += sample_result;
-          }
+          this->samples.at(cd).oprobit_predict_proba_write_target(
+              sample_result, score, X, relations, cutpoint_index, false);
+          partial_sum += sample_result;
+        }
+        {
+          std::lock_guard<std::mutex> lock{mtx};
+          result += partial_sum;
         }
       });
     }
@@ -130,24 +139,174 @@ template <typename Real, class FMType = FM<Real>> struct Predictor {
       throw std::runtime_error("Empty samples!");
     }
     Vector result = Vector::Zero(X.rows());
-    Vector cache = Vector(X.rows());
-    for (auto iter = samples.cbegin(); iter != samples.cend(); iter++) {
-      iter->predict_score_write_target(cache, X, relations);
+    const size_t batch_size = this->batch_size(X.rows(), 1);
+    DenseMatrix cache(X.rows(), batch_size);
+    for (size_t begin = 0; begin < samples.size(); begin += batch_size) {
+      size_t end = std::min(begin + batch_size, samples.size());
+      auto scores = cache.leftCols(end - begin);
+      predict_score_batch_write_target(scores, begin, end, X, relations);
       if (type == TASKTYPE::REGRESSION) {
-        result += cache;
+        result += scores.rowwise().sum();
       } else if (type == TASKTYPE::CLASSIFICATION) {
         result.array() +=
-            ((cache.array() * static_cast<Real>(std::sqrt(0.5))).erf() +
-             static_cast<Real>(1)) /
-            static_cast<Real>(2);
+            (((scores.array() * static_cast<Real>(std::sqrt(0.5))).erf() +
+              static_cast<Real>(1)) /
+             static_cast<Real>(2))
+                .rowwise()
+                .sum();
       }
     }
     result.array() /= static_cast<Real>(samples.size());
     return result;
   }
 
+  /*
+  The number of samples whose parameters are stacked into a single pass.
+  It is bounded so that the (n_rows, batch_size) score buffer stays below
+  max_batch_buffer_size entries, the stacked parameters (which are accessed
+  at random per non-zero) stay below max_batch_parameter_size entries, and
+  each worker still receives some samples.
+  */
+  inline size_t batch_size(size_t n_rows, size_t n_workers) const {
+    const size_t n_workers_ = std::max<size_t>(n_workers, 1);
+    size_t result =
+        std::min(max_batch_buffer_size / std::max<size_t>(n_rows, 1),
+                 samples_per_chunk());
+    result = std::min(result, (samples.size() + n_workers_ - 1) / n_workers_);
+    return std::max<size_t>(result, 1);
+  }
+
+  // The number of samples whose parameters are stacked into a single chunk.
+  inline size_t samples_per_chunk() const {
+    return std::max<size_t>(max_batch_parameter_size /
+                                std::max<size_t>(feature_size * (rank + 1), 1),
+                            1);
+  }
+
+  // Evaluate the samples [begin, begin + n) of a chunk; see stack_parameters().
+  template <typename ChunkType, typename SqtType>
+  inline void predict_score_chunk(Eigen::Ref<DenseMatrix> target,
+                                  const Eigen::Ref<const Vector> &w0s,
+                                  const ChunkType &chunk, size_t begin,
+                                  size_t n, const SqtType &sqt,
+                                  const SparseMatrix &X,
+                                  const vector<RelationBlock> &relations,
+                                  bool use_openmp) const {
+    const size_t n_chunk = chunk.cols() / (rank + 1);
+    FMType::predict_score_stacked(
+        target, w0s, chunk.middleCols(begin, n),
+        chunk.middleCols(n_chunk + begin * rank, n * rank), sqt, X, relations,
+        use_openmp);
+  }
+
+  inline void
+  predict_score_batch_write_target(Eigen::Ref<DenseMatrix> target, size_t begin,
+                                   size_t end, const SparseMatrix &X,
+                                   const vector<RelationBlock> &relations,
+                                   bool use_openmp = true) const {
+    // a snapshot, as stack_parameters() may run concurrently.
+    const std::shared_ptr<const ParameterStack> stack =
+        std::atomic_load(&parameter_stack);
+    if (!stack || stack->n_samples != samples.size()) {
+      // gather the parameters of this batch only.
+      const size_t n_batch = end - begin;
+      Vector w0s(n_batch);
+      RowMajorDenseMatrix sqt(feature_size, n_batch);
+      RowMajorDenseMatrix WV(feature_size, n_batch * (rank + 1));
+      for (size_t k = 0; k < n_batch; k++) {
+        const FMType &fm = samples[begin + k];
+        w0s(k) = fm.w0;
+        sqt.col(k) = fm.V.rowwise().squaredNorm();
+        WV.col(k) = fm.w;
+        WV.middleCols(n_batch + k * rank, rank) = fm.V;
+      }
+      predict_score_chunk(target, w0s, WV, 0, n_batch, sqt, X, relations,
+                          use_openmp);
+      return;
+    }
+    const size_t chunk_size = samples_per_chunk();
+    // a batch which straddles chunks is evaluated chunk by chunk.
+    for (size_t piece_begin = begin; piece_begin < end;) {
+      const size_t chunk_index = piece_begin / chunk_size;
+      const size_t chunk_begin = chunk_index * chunk_size;
+      const size_t piece_end = std::min(end, chunk_begin + chunk_size);
+      const size_t n_piece = piece_end - piece_begin;
+      auto piece_target = target.middleCols(piece_begin - begin, n_piece);
+      auto w0s = stack->w0.segment(piece_begin, n_piece);
+      auto sqt = stack->sqt.middleCols(piece_begin, n_piece);
+      if (stack->single_precision) {
+        predict_score_chunk(piece_target, w0s, stack->WV_single[chunk_index],
+                            piece_begin - chunk_begin, n_piece, sqt, X,
+                            relations, use_openmp);
+      } else {
+        predict_score_chunk(piece_target, w0s, stack->WV[chunk_index],
+                            piece_begin - chunk_begin, n_piece, sqt, X,
+                            relations, use_openmp);
+      }
+      piece_begin = piece_end;
+    }
+  }
+
+  /*
+  Keep a copy of the parameters of all the samples in row-major chunks of
+  samples_per_chunk() samples, so that prediction reads them in place instead
+  of gathering them for every batch. A chunk of n samples holds their w in
+  the first n columns, followed by their V.
+  As this duplicates w and V of all the samples, it is done only on request.
+  If single_precision is set, they are stacked as float instead, which halves
+  both the extra memory and the bandwidth of prediction at the cost of
+  precision; the scores are still accumulated in Real.
+  The stack is replaced atomically, so this may be called while another
+  thread is predicting.
+  */
+  inline void stack_parameters(bool single_precision) {
+    const size_t n_samples = samples.size();
+    const size_t chunk_size = samples_per_chunk();
+    auto stack = std::make_shared<ParameterStack>();
+    stack->n_samples = n_samples;
+    stack->single_precision = single_precision;
+    stack->w0.resize(n_samples);
+    stack->sqt.resize(feature_size, n_samples);
+    for (size_t chunk_begin = 0; chunk_begin < n_samples;
+         chunk_begin += chunk_size) {
+      const size_t n_chunk = std::min(chunk_size, n_samples - chunk_begin);
+      RowMajorDenseMatrix WV(feature_size, n_chunk * (rank + 1));
+      for (size_t k = 0; k < n_chunk; k++) {
+        const FMType &fm = samples[chunk_begin + k];
+        stack->w0(chunk_begin + k) = fm.w0;
+        stack->sqt.col(chunk_begin + k) = fm.V.rowwise().squaredNorm();
+        WV.col(k) = fm.w;
+        WV.middleCols(n_chunk + k * rank, rank) = fm.V;
+      }
+      if (single_precision) {
+        stack->WV_single.emplace_back(WV.template cast<float>());
+      } else {
+        stack->WV.emplace_back(std::move(WV));
+      }
+    }
+    std::atomic_store(&parameter_stack,
+                      std::shared_ptr<const ParameterStack>(std::move(stack)));
+  }
+
+  inline void clear_parameter_stack() {
+    std::atomic_store(&parameter_stack,
+                      std::shared_ptr<const ParameterStack>());
+  }
+
+  inline bool parameters_stacked() const {
+    return static_cast<bool>(std::atomic_load(&parameter_stack));
+  }
+
+  inline bool single_precision() const {
+    const auto stack = std::atomic_load(&parameter_stack);
+    return stack && stack->single_precision;
+  }
+
   inline void set_samples(vector<FMType> &&samples_from) {
     samples = std::forward<vector<FMType>>(samples_from);
+    if (parameters_stacked()) {
+      stack_parameters(single_precision());
+    }
   }
 
   inline void add_sample(const FMType &fm) {
@@ -160,10 +319,28 @@ template <typename Real, class FMType = FM<Real>> struct Predictor {
     samples.emplace_back(fm);
   }
 
+  static constexpr size_t max_batch_buffer_size = size_t(1) << 24;
+  static constexpr size_t max_batch_parameter_size = size_t(1) << 18;
+
   const size_t rank;
   const size_t feature_size;
   const TASKTYPE type;
   vector<FMType> samples;
+
+private:
+  typedef types::RowMajorDenseMatrix<float> RowMajorDenseMatrixSingle;
+
+  // see stack_parameters().
+  struct ParameterStack {
+    size_t n_samples;
+    bool single_precision;
+    Vector w0;                                   // (n_samples)
+    RowMajorDenseMatrix sqt;                     // (feature_size, n_samples)
+    vector<RowMajorDenseMatrix> WV;              // unless single_precision
+    vector<RowMajorDenseMatrixSingle> WV_single; // if single_precision
+  };
+
+  std::shared_ptr<const ParameterStack> parameter_stack;
 };
 
 } // namespace myFM
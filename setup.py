@@ -63,6 +63,10 @@ headers = [
 ]
 
 
+# Eigen runs large sparse-dense products on multiple threads if built with OpenMP.
+# This is opt-in, since `predict_parallel` already spreads the samples over threads.
+openmp_flags = ["-fopenmp"] if os.environ.get("MYFM_USE_OPENMP", "0") == "1" else []
+
 ext_modules = [
     Pybind11Extension(
         "myfm._myfm",
@@ -72,6 +76,8 @@ ext_modules = [
             get_eigen_include(),
             "include",
         ],
+        extra_compile_args=openmp_flags,
+        extra_link_args=openmp_flags,
     ),
 ]
 
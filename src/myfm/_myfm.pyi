@@ -186,6 +186,23 @@ class Predictor:
         """
         :type: List[FM]
         """
+    def stack_parameters(self, single_precision: bool = False) -> None:
+        """
+        Keep a copy of the parameters in a layout faster to predict with.
+        """
+    def clear_parameter_stack(self) -> None: ...
+    @property
+    def parameters_stacked(self) -> bool:
+        """
+        :type: bool
+        """
+    @property
+    def single_precision(self) -> bool:
+        """
+        Whether the stacked parameters are kept in single precision.
+
+        :type: bool
+        """
     pass
 
 class RelationBlock:
@@ -1,10 +1,13 @@
 from abc import ABC, abstractclassmethod, abstractmethod, abstractproperty
 from collections import OrderedDict
+from contextlib import contextmanager
 from typing import (
     TYPE_CHECKING,
+    Any,
     Callable,
     Dict,
     Generic,
+    Iterator,
     List,
     Optional,
     Tuple,
@@ -39,7 +42,7 @@ ArrayLike = Union[np.ndarray, sps.csr_matrix]
 
 
 def std_cdf(x: DenseArray) -> DenseArray:
-    _: DenseArray = (1 + special.erf(x * np.sqrt(0.5))) / 2
+    _: DenseArray = special.ndtr(x)
     return _
 
 
@@ -61,6 +64,29 @@ def check_data_consistency(X: Optional[ArrayLike], X_rel: List[RelationBlock]) -
         return shape
 
 
+def as_csr_float64(X: ArrayLike) -> sps.csr_matrix:
+    """Convert the input into a float64 CSR matrix with sorted indices.
+
+    If X already satisfies these conditions, it is returned without a copy.
+    """
+    if isinstance(X, sps.csr_matrix) and X.dtype == REAL and X.has_sorted_indices:
+        return X
+    result = sps.csr_matrix(X, dtype=REAL)
+    if not result.has_sorted_indices:
+        result = result.sorted_indices()
+    return result
+
+
+def _buffer_address(X: Any) -> Optional[int]:
+    if isinstance(X, np.ndarray):
+        address: int = X.ctypes.data
+        return address
+    if isinstance(X, (sps.csr_matrix, sps.csc_matrix, sps.coo_matrix)):
+        address = X.data.ctypes.data
+        return address
+    return None
+
+
 FM = TypeVar("FM", _myfm.FM, _myfm.VariationalFM)
 Predictor = TypeVar("Predictor", _myfm.Predictor, _myfm.VariationalPredictor)
 History = TypeVar("History", _myfm.LearningHistory, _myfm.VariationalLearningHistory)
@@ -165,6 +191,15 @@ class MyFMBase(Generic[FM, Hyper, Predictor, History], ABC):
 
         self.n_groups_: Optional[int] = None
 
+        self._reuse_prediction_input = False
+        self._predict_input_cache: Optional[Tuple[Any, int, sps.csr_matrix]] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_reuse_prediction_input"] = False
+        state["_predict_input_cache"] = None
+        return state
+
     def __str__(self) -> str:
         return "{class_name}(init_stdev={init_stdev}, alpha_0={alpha_0}, beta_0={beta_0}, gamma_0={gamma_0}, mu_0={mu_0}, reg_0={reg_0})".format(
             class_name=self.__class__.__name__,
@@ -230,7 +265,7 @@ class MyFMBase(Generic[FM, Hyper, Predictor, History], ABC):
         if X is None:
             X = sps.csr_matrix((train_size, 0), dtype=REAL)
         else:
-            X = sps.csr_matrix(X)
+            X = as_csr_float64(X)
 
         assert X.shape[0] == y.shape[0]
         dim_all = X.shape[1] + sum([rel.feature_size for rel in X_rel])
@@ -269,11 +304,14 @@ class MyFMBase(Generic[FM, Hyper, Predictor, History], ABC):
                     "Must specify both (X_test or X_rel_test) and y_test."
                 )
             test_size = check_data_consistency(X_test, X_rel_test)
+            # The callback evaluates the test set repeatedly,
+            # so the conversions are done here once.
+            y_test = np.asarray(y_test)
             assert test_size == y_test.shape[0]
             if X_test is None:
-                X_test = sps.csr_matrix((test_size, 0), dtype=np.float64)
+                X_test = sps.csr_matrix((test_size, 0), dtype=REAL)
             else:
-                X_test = sps.csr_matrix(X_test)
+                X_test = as_csr_float64(X_test)
             do_test = True
         elif y_test is not None:
             raise RuntimeError("Must specify both (X_test or X_rel_test) and y_test.")
@@ -282,8 +320,6 @@ class MyFMBase(Generic[FM, Hyper, Predictor, History], ABC):
 
         config_builder.set_n_iter(n_iter).set_n_kept_samples(n_kept_samples)
 
-        if X.dtype != np.float64:
-            X = X.astype(np.float64)
         y = self._process_y(y)
         self._set_tasktype(config_builder)
 
@@ -301,14 +337,24 @@ class MyFMBase(Generic[FM, Hyper, Predictor, History], ABC):
             callback_not_null = callback
 
         with tqdm(total=n_iter) as pbar:
+            # Progress is reported in batches, as a single sweep can be
+            # cheaper than updating the bar.
+            n_pending = [0]
 
             def wrapped_callback(
                 i: int, fm: FM, hyper: Hyper, history: History
             ) -> bool:
                 should_stop, message = callback_not_null(i, fm, hyper, history)
+                n_pending[0] += 1
                 if message is not None:
-                    pbar.set_description(message)
-                pbar.update(1)
+                    pbar.set_description(message, refresh=False)
+                if (
+                    message is not None
+                    or should_stop
+                    or n_pending[0] >= callback_default_freq
+                ):
+                    pbar.update(n_pending[0])
+                    n_pending[0] = 0
                 return should_stop
 
             self.predictor_, self.history_ = self._train_core(
@@ -321,6 +367,50 @@ class MyFMBase(Generic[FM, Hyper, Predictor, History], ABC):
                 config,
                 wrapped_callback,
             )
+            pbar.update(n_pending[0])
+
+    @contextmanager
+    def reuse_prediction_input(self) -> Iterator[None]:
+        """Reuse the conversion of the prediction input within this context.
+
+        The input of prediction methods is converted into a float64 CSR matrix
+        on every call, unless it already is one.
+        Within this context, repeated predictions on the same dense array or
+        sparse matrix (e.g., during calibration) convert it only once.
+
+        The input is identified by the object itself and the address of its buffer,
+        so it must not be modified in place within the context; otherwise
+        the predictions for its previous content are returned.
+        The converted matrix is released when the context exits.
+        """
+        self._reuse_prediction_input = True
+        try:
+            yield
+        finally:
+            self._reuse_prediction_input = False
+            self._predict_input_cache = None
+
+    def _prepare_X_for_prediction(
+        self, X: Optional[ArrayLike], X_rel: List[RelationBlock]
+    ) -> sps.csr_matrix:
+        """Convert X into a float64 CSR matrix for the predictor.
+
+        Within `reuse_prediction_input`, the previous conversion is reused.
+        """
+        shape = check_data_consistency(X, X_rel)
+        if X is None:
+            return sps.csr_matrix((shape, 0), dtype=REAL)
+        if not getattr(self, "_reuse_prediction_input", False):
+            return as_csr_float64(X)
+
+        address = _buffer_address(X)
+        cache = getattr(self, "_predict_input_cache", None)
+        if cache is not None and cache[0] is X and cache[1] == address:
+            return cache[2]
+        X_csr = as_csr_float64(X)
+        if X_csr is not X and address is not None:
+            self._predict_input_cache = (X, address, X_csr)
+        return X_csr
 
     def _set_tasktype(self, config_builder: ConfigBuilder) -> None:
         config_builder.set_task_type(self._task_type)
@@ -336,7 +426,7 @@ class MyFMBase(Generic[FM, Hyper, Predictor, History], ABC):
         raise NotImplementedError("must be implemented")
 
     def _process_y(self, y: np.ndarray) -> DenseArray:
-        return y.astype(np.float64)
+        return np.asarray(y, dtype=np.float64)
 
     @abstractmethod
     def _measure_score(
@@ -367,8 +457,10 @@ class RegressorMixin(Generic[FM, Hyper]):
 
     def _measure_score(self, prediction: np.ndarray, y: np.ndarray) -> Dict[str, float]:
         result = OrderedDict()
-        result["rmse"] = ((y - prediction) ** 2).mean() ** 0.5
-        result["mae"] = np.abs(y - prediction).mean()
+        residual = y - prediction
+        mae = np.abs(residual).mean()
+        result["rmse"] = np.square(residual, out=residual).mean() ** 0.5
+        result["mae"] = mae
         return result
 
 
@@ -383,14 +475,16 @@ class ClassifierMixin(Generic[FM, Hyper], ABC):
         return std_cdf(fm.predict_score(X, X_rel))
 
     def _process_y(self, y: np.ndarray) -> np.ndarray:
-        return y.astype(np.float64) * 2 - 1
+        y_as_float: np.ndarray = np.multiply(y, 2.0, dtype=np.float64)
+        y_as_float -= 1
+        return y_as_float
 
     def _measure_score(self, prediction: np.ndarray, y: np.ndarray) -> Dict[str, float]:
         result = OrderedDict()
-        lp = np.log(prediction + 1e-15)
-        l1mp = np.log(1 - prediction + 1e-15)
         gt = y > 0
-        result["ll"] = (-lp.dot(gt) - l1mp.dot(~gt)) / max(1, prediction.shape[0])
+        # probability assigned to the observed class.
+        p_observed = np.where(gt, prediction, 1 - prediction)
+        result["ll"] = -np.log(p_observed + 1e-15).sum() / max(1, prediction.shape[0])
         result["accuracy"] = np.mean((prediction >= 0.5) == gt)
         return result
 
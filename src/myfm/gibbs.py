@@ -17,7 +17,6 @@ from ._myfm import (
     create_train_fm,
 )
 from .base import (
-    REAL,
     ArrayLike,
     BinaryClassificationTarget,
     ClassifierMixin,
@@ -25,7 +24,6 @@ from .base import (
     DenseArray,
     MyFMBase,
     RegressorMixin,
-    check_data_consistency,
 )
 
 
@@ -80,11 +78,7 @@ class MyFMGibbsBase(
     ) -> DenseArray:
 
         predictor = self._fetch_predictor()
-        shape = check_data_consistency(X, X_rel)
-        if X is None:
-            X = sps.csr_matrix((shape, 0), dtype=REAL)
-        else:
-            X = sps.csr_matrix(X)
+        X = self._prepare_X_for_prediction(X, X_rel)
         if n_workers is None:
             return predictor.predict(X, X_rel)
         else:
@@ -450,10 +444,10 @@ class MyFMOrderedProbit(MyFMGibbsBase):
     def _prepare_prediction_for_test(
         self, fm: FM, X: ArrayLike, X_rel: List[RelationBlock]
     ) -> np.ndarray:
-        return fm.oprobit_predict_proba(sps.csr_matrix(X, dtype=np.float64), X_rel, 0)
+        return fm.oprobit_predict_proba(X, X_rel, 0)
 
     def _process_y(self, y: np.ndarray) -> np.ndarray:
-        y_as_float = y.astype(np.float64)
+        y_as_float = np.asarray(y, dtype=np.float64)
         assert y.min() >= 0
         return y_as_float
 
@@ -489,6 +483,8 @@ class MyFMOrderedProbit(MyFMGibbsBase):
             The input data.
         X_rel : List[RelationBlock], optional
             Relational Block part of the data., by default []
+        n_workers : Optional[int], optional
+            The number of threads to compute the posterior predictive mean, by default None
 
         Returns
         -------
@@ -497,21 +493,14 @@ class MyFMOrderedProbit(MyFMGibbsBase):
         """
 
         predictor = self._fetch_predictor()
-
-        shape = check_data_consistency(X, X_rel)
-        if X is None:
-            X = sps.csr_matrix((shape, 0), dtype=REAL)
-        else:
-            X = sps.csr_matrix(X)
-
-        if X.dtype != REAL:
-            X.data = X.data.astype(REAL)
+        X = self._prepare_X_for_prediction(X, X_rel)
         return predictor.predict_parallel_oprobit(X, X_rel, n_workers or 1, 0)
 
     def predict(
         self,
         X: ArrayLike,
         X_rel: List[RelationBlock] = [],
+        n_workers: Optional[int] = None,
     ) -> ClassIndexArray:
         r"""Predict the class outcome according to the class probability.
 
@@ -521,6 +510,8 @@ class MyFMOrderedProbit(MyFMGibbsBase):
             The input data.
         X_rel : List[RelationBlock], optional
             Relational Block part of the data., by default []
+        n_workers : Optional[int], optional
+            The number of threads to compute the posterior predictive mean, by default None
 
         Returns
         -------
@@ -528,7 +519,9 @@ class MyFMOrderedProbit(MyFMGibbsBase):
             The class prediction
         """
 
-        result: ClassIndexArray = self.predict_proba(X, X_rel=X_rel).argmax(axis=1)
+        result: ClassIndexArray = self.predict_proba(
+            X, X_rel=X_rel, n_workers=n_workers
+        ).argmax(axis=1)
         return result
 
     @property
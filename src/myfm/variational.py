@@ -13,14 +13,7 @@ from ._myfm import (
     VariationalPredictor,
     create_train_vfm,
 )
-from .base import (
-    REAL,
-    ArrayLike,
-    ClassifierMixin,
-    MyFMBase,
-    RegressorMixin,
-    check_data_consistency,
-)
+from .base import ArrayLike, ClassifierMixin, MyFMBase, RegressorMixin
 
 ArrayOrDenseArray = TypeVar("ArrayOrDenseArray", np.ndarray, float)
 
@@ -159,11 +152,7 @@ class MyFMVariationalBase(
         X_rel: List[RelationBlock] = [],
     ) -> np.ndarray:
         predictor = self._fetch_predictor()
-        shape = check_data_consistency(X, X_rel)
-        if X is None:
-            X = sps.csr_matrix((shape, 0), dtype=REAL)
-        else:
-            X = sps.csr_matrix(X)
+        X = self._prepare_X_for_prediction(X, X_rel)
         return predictor.predict(X, X_rel)
 
 
@@ -68,3 +68,11 @@ def test_middle_clf(
                 sample_cross_term = s.V[i].dot(s.V[j])
                 assert sample_cross_term > sign * cross_term * 0.5
                 assert sample_cross_term < sign * cross_term * 2
+
+
+@pytest.mark.parametrize("dtype", [np.bool_, np.int64, np.float32, np.float64])
+def test_process_y(dtype: type) -> None:
+    y = np.asarray([0, 1, 1, 0], dtype=dtype)
+    y_processed = MyFMGibbsClassifier(3)._process_y(y)
+    assert y_processed.dtype == np.float64
+    np.testing.assert_array_equal(y_processed, [-1.0, 1.0, 1.0, -1.0])
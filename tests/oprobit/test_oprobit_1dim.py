@@ -59,3 +59,8 @@ def test_oprobit(use_libfm_callback: bool) -> None:
         result_manual += diff[:, 1:] - diff[:, :-1]
     result_manual /= n_
     np.testing.assert_allclose(result_manual, p_using_core)
+
+    np.testing.assert_allclose(fm.predict_proba(X[:, None], n_workers=3), p_using_core)
+    np.testing.assert_array_equal(
+        fm.predict(X[:, None], n_workers=3), p_using_core.argmax(axis=1)
+    )
@@ -48,7 +48,7 @@ def test_block_vfm() -> None:
         RelationBlock(item_indices, item_block),
     ]
     with tempfile.TemporaryFile() as temp_fs:
-        pickle.dump(blocks, temp_fs)
+        pickle.dump(blocks, temp_fs, protocol=pickle.HIGHEST_PROTOCOL)
         del blocks
         temp_fs.seek(0)
         blocks = pickle.load(temp_fs)
@@ -65,7 +65,7 @@ def test_block_vfm() -> None:
     )
 
     with tempfile.TemporaryFile() as temp_fs:
-        pickle.dump(fm_blocked_serialized, temp_fs)
+        pickle.dump(fm_blocked_serialized, temp_fs, protocol=pickle.HIGHEST_PROTOCOL)
         del fm_blocked_serialized
         temp_fs.seek(0)
         fm_blocked: VariationalFMRegressor = pickle.load(temp_fs)
@@ -139,7 +139,7 @@ def test_block() -> None:
         np.testing.assert_allclose(s_flatten.V, s_blocked.V)
 
     with tempfile.TemporaryFile() as temp_fs:
-        pickle.dump(fm_blocked, temp_fs)
+        pickle.dump(fm_blocked, temp_fs, protocol=pickle.HIGHEST_PROTOCOL)
         del fm_blocked
         temp_fs.seek(0)
         fm_blocked = pickle.load(temp_fs)
@@ -1,3 +1,4 @@
+import pickle
 from typing import Optional, Tuple
 
 import numpy as np
@@ -70,3 +71,60 @@ def test_middle_reg(
                 sample_cross_term = V_[i].dot(V_[j])
                 assert sample_cross_term > sign * cross_term * 0.5
                 assert sample_cross_term < sign * cross_term * 2
+
+
+def test_predict_input_cache(middle_data: Tuple[sps.csr_matrix, np.ndarray]) -> None:
+    X, score = middle_data
+    fm = MyFMGibbsRegressor(3).fit(X, score, n_iter=10)
+    expected = fm.predict(X)
+    X_dense = X.toarray()
+
+    # Nothing is cached unless asked to.
+    np.testing.assert_allclose(fm.predict(X_dense), expected)
+    assert fm._predict_input_cache is None
+
+    with fm.reuse_prediction_input():
+        # X is already a float64 CSR matrix, so nothing has to be cached.
+        np.testing.assert_allclose(fm.predict(X), expected)
+        assert fm._predict_input_cache is None
+
+        np.testing.assert_allclose(fm.predict(X_dense), expected)
+        cache = fm._predict_input_cache
+        assert cache is not None and cache[0] is X_dense
+        np.testing.assert_allclose(fm.predict(X_dense, n_workers=2), expected)
+        assert fm._predict_input_cache is cache
+
+        X_dense_2 = X_dense * 2
+        fm.predict(X_dense_2)
+        cache = fm._predict_input_cache
+        assert cache is not None and cache[0] is X_dense_2
+
+        fm_restored: MyFMGibbsRegressor = pickle.loads(pickle.dumps(fm))
+        assert fm_restored._predict_input_cache is None
+        np.testing.assert_allclose(fm_restored.predict(X_dense), expected)
+        assert fm_restored._predict_input_cache is None
+
+    assert fm._predict_input_cache is None
+    # In-place modifications are seen once the context has exited.
+    X_dense[:] = 0
+    np.testing.assert_allclose(fm.predict(X_dense), fm.predict(sps.csr_matrix(X_dense)))
+
+
+def test_predict_input_cache_old_state(
+    middle_data: Tuple[sps.csr_matrix, np.ndarray]
+) -> None:
+    # Estimators pickled by earlier versions have neither attribute.
+    X, score = middle_data
+    fm = MyFMGibbsRegressor(3).fit(X, score, n_iter=10)
+    expected = fm.predict(X)
+    state = fm.__getstate__()
+    del state["_reuse_prediction_input"]
+    del state["_predict_input_cache"]
+    fm_old: MyFMGibbsRegressor = MyFMGibbsRegressor.__new__(MyFMGibbsRegressor)
+    fm_old.__dict__.update(state)
+
+    X_dense = X.toarray()
+    np.testing.assert_allclose(fm_old.predict(X_dense), expected)
+    with fm_old.reuse_prediction_input():
+        np.testing.assert_allclose(fm_old.predict(X_dense), expected)
+        np.testing.assert_allclose(fm_old.predict(X_dense), expected)
@@ -0,0 +1,184 @@
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pytest
+import scipy.sparse as sps
+from scipy.special import ndtr
+
+from myfm import (
+    MyFMGibbsClassifier,
+    MyFMGibbsRegressor,
+    MyFMOrderedProbit,
+    RelationBlock,
+    VariationalFMRegressor,
+)
+from myfm.gibbs import MyFMGibbsBase
+
+from .test_utils import FMWeights, prediction
+
+
+def create_data(
+    n_features: int, with_blocks: bool
+) -> Tuple[sps.csr_matrix, List[RelationBlock], sps.csr_matrix, np.ndarray]:
+    rns = np.random.RandomState(0)
+    n_rows = 200
+    X = sps.random(n_rows, n_features, density=0.05, random_state=rns, format="csr")
+    blocks: List[RelationBlock] = []
+    X_flatten = X
+    if with_blocks:
+        n_block_rows = 30
+        X_block = sps.random(
+            n_block_rows, 7, density=0.3, random_state=rns, format="csr"
+        )
+        indices = rns.randint(0, n_block_rows, size=n_rows)
+        blocks.append(RelationBlock(indices, X_block))
+        X_flatten = sps.hstack([X, X_block[indices]], format="csr")
+    y = rns.normal(size=n_rows)
+    return X, blocks, X_flatten, y
+
+
+def sample_scores(fm: MyFMGibbsBase, X_flatten: sps.csr_matrix) -> np.ndarray:
+    assert fm.predictor_ is not None
+    return np.asfarray(
+        [
+            prediction(X_flatten, FMWeights(sample.w0, sample.w, sample.V.T))
+            for sample in fm.predictor_.samples
+        ]
+    )
+
+
+@pytest.mark.parametrize("rank", [0, 3])
+@pytest.mark.parametrize("with_blocks", [False, True])
+@pytest.mark.parametrize("n_workers", [None, 1, 3])
+def test_predict_reference(
+    rank: int, with_blocks: bool, n_workers: Optional[int]
+) -> None:
+    X, blocks, X_flatten, y = create_data(20, with_blocks)
+    # 7 samples are never split evenly among the workers.
+    fm = MyFMGibbsRegressor(rank).fit(X, y, blocks, n_iter=17, n_kept_samples=7)
+    expected = sample_scores(fm, X_flatten).mean(axis=0)
+    np.testing.assert_allclose(fm.predict(X, blocks, n_workers=n_workers), expected)
+
+    clf = MyFMGibbsClassifier(rank).fit(X, y > 0, blocks, n_iter=17, n_kept_samples=7)
+    expected_proba = ndtr(sample_scores(clf, X_flatten)).mean(axis=0)
+    np.testing.assert_allclose(
+        clf.predict_proba(X, blocks, n_workers=n_workers), expected_proba
+    )
+
+    oprobit = MyFMOrderedProbit(rank).fit(
+        X, (y > 0).astype(np.int64) + (y > 1), blocks, n_iter=17, n_kept_samples=7
+    )
+    assert oprobit.predictor_ is not None
+    expected_proba = np.zeros((X.shape[0], 3))
+    for score, sample in zip(
+        sample_scores(oprobit, X_flatten), oprobit.predictor_.samples
+    ):
+        cdf = ndtr(sample.cutpoints[0][np.newaxis, :] - score[:, np.newaxis])
+        expected_proba += np.diff(cdf, axis=1, prepend=0.0, append=1.0)
+    expected_proba /= 7
+    np.testing.assert_allclose(
+        oprobit.predict_proba(X, blocks, n_workers=n_workers), expected_proba
+    )
+
+
+def test_predict_reference_multiple_batches() -> None:
+    # The parameters of 20000 features and rank 3 exceed the batch size limit,
+    # so the 7 samples are processed in several batches. Once stacked, they are
+    # kept in chunks of 3, and some of the batches straddle two chunks.
+    X, blocks, X_flatten, y = create_data(20000, True)
+    fm = MyFMGibbsRegressor(3).fit(X, y, blocks, n_iter=10, n_kept_samples=7)
+    expected = sample_scores(fm, X_flatten).mean(axis=0)
+    for n_workers in [None, 2, 4]:
+        np.testing.assert_allclose(fm.predict(X, blocks, n_workers=n_workers), expected)
+
+    assert fm.predictor_ is not None
+    assert not fm.predictor_.parameters_stacked
+    fm.predictor_.stack_parameters()
+    assert fm.predictor_.parameters_stacked
+    assert not fm.predictor_.single_precision
+    for n_workers in [None, 2, 4]:
+        np.testing.assert_allclose(fm.predict(X, blocks, n_workers=n_workers), expected)
+
+    fm.predictor_.stack_parameters(single_precision=True)
+    assert fm.predictor_.single_precision
+    for n_workers in [None, 4]:
+        np.testing.assert_allclose(
+            fm.predict(X, blocks, n_workers=n_workers), expected, atol=1e-5
+        )
+    fm_restored: MyFMGibbsRegressor = pickle.loads(pickle.dumps(fm))
+    assert fm_restored.predictor_ is not None
+    assert fm_restored.predictor_.parameters_stacked
+    assert fm_restored.predictor_.single_precision
+    np.testing.assert_allclose(fm_restored.predict(X, blocks), expected, atol=1e-5)
+
+    fm.predictor_.clear_parameter_stack()
+    assert not fm.predictor_.parameters_stacked
+    np.testing.assert_allclose(fm.predict(X, blocks), expected)
+
+
+def test_predict_concurrently() -> None:
+    # The predictors release the GIL, so that Python threads can predict at once.
+    X, blocks, _, y = create_data(20, True)
+    fm = MyFMGibbsRegressor(3).fit(X, y, blocks, n_iter=17, n_kept_samples=7)
+    vfm = VariationalFMRegressor(3).fit(X, y, blocks, n_iter=17)
+    oprobit = MyFMOrderedProbit(3).fit(
+        X, (y > 0).astype(np.int64) + (y > 1), blocks, n_iter=17, n_kept_samples=7
+    )
+    tasks = [
+        lambda: fm.predict(X, blocks),
+        lambda: fm.predict(X, blocks, n_workers=2),
+        lambda: vfm.predict(X, blocks),
+        lambda: oprobit.predict_proba(X, blocks, n_workers=2),
+    ]
+    expected = [task() for task in tasks]
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(task) for _ in range(4) for task in tasks]
+        for i, future in enumerate(futures):
+            np.testing.assert_allclose(future.result(), expected[i % len(tasks)])
+
+    # The parameter stack may be replaced while predicting.
+    assert fm.predictor_ is not None
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(tasks[i % 2]) for i in range(16)]
+        for _ in range(8):
+            fm.predictor_.stack_parameters()
+            fm.predictor_.clear_parameter_stack()
+        for i, future in enumerate(futures):
+            np.testing.assert_allclose(future.result(), expected[i % 2])
+
+
+def test_predict_score_speed() -> None:
+    # A regression guard for the single-FM path, which is also used in every
+    # Gibbs sweep: it should not be much slower than the scipy reference.
+    rns = np.random.RandomState(0)
+    n_rows, n_features, nnz_per_row, rank = 20000, 20000, 20, 32
+    X = sps.csr_matrix(
+        (
+            rns.rand(n_rows * nnz_per_row),
+            rns.randint(0, n_features, size=n_rows * nnz_per_row),
+            np.arange(0, n_rows * nnz_per_row + 1, nnz_per_row),
+        ),
+        shape=(n_rows, n_features),
+    )
+    X.sum_duplicates()
+    fm = MyFMGibbsRegressor(rank).fit(
+        X[:500], rns.normal(size=500), n_iter=2, n_kept_samples=1
+    )
+    assert fm.predictor_ is not None
+    sample = fm.predictor_.samples[0]
+    weights = FMWeights(sample.w0, sample.w, sample.V.T)
+
+    def best_time(f: Callable[[], np.ndarray]) -> float:
+        times = []
+        for _ in range(5):
+            start = time.process_time()
+            f()
+            times.append(time.process_time() - start)
+        return min(times)
+
+    time_core = best_time(lambda: sample.predict_score(X, []))
+    time_reference = best_time(lambda: prediction(X, weights))
+    assert time_core < 2.5 * time_reference
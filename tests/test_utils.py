@@ -14,8 +14,7 @@ class FMWeights(NamedTuple):
 
 
 def prediction(X: sps.csr_matrix, weight: FMWeights) -> np.ndarray:
-    X2 = X.copy()
-    X2.data[:] = X2.data**2
+    X2 = sps.csr_matrix((X.data**2, X.indices, X.indptr), shape=X.shape)
     result = np.zeros(X.shape[0], dtype=np.float64)
     result[:] = weight.global_bias
     result += X.dot(weight.weight)